@@ -102,6 +102,16 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Upload limits, applied to each statement and to a batch once unpacked
+MAX_STATEMENT_SIZE = 10 * 1024 * 1024
+MAX_BATCH_SIZE = 200 * 1024 * 1024
+
+# Longest a batch progress event stream stays open, in seconds
+SSE_MAX_SECONDS = 600
+
+# Per-user columnar analytics snapshots
+SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -109,6 +119,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "tailwind"
 CRISPY_TEMPLATE_PACK = "tailwind"
 
+# Logging
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.getenv('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # Authentication
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import UploadedFile, Transaction
+from .models import UploadBatch, UploadedFile, Transaction, RecurringPayment, MerchantCategory
+
+@admin.register(UploadBatch)
+class UploadBatchAdmin(admin.ModelAdmin):
+    list_display = ('user', 'bank_name', 'created_at')
+    list_filter = ('bank_name', 'created_at')
+    search_fields = ('user__username', 'bank_name')
 
 @admin.register(UploadedFile)
 class UploadedFileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'bank_name', 'uploaded_at', 'processed')
+    list_display = ('user', 'bank_name', 'uploaded_at', 'processed', 'reconciled', 'batch')
     list_filter = ('bank_name', 'processed', 'uploaded_at')
     search_fields = ('user__username', 'bank_name')
 
@@ -11,4 +17,16 @@ class UploadedFileAdmin(admin.ModelAdmin):
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('date', 'description', 'amount', 'category', 'balance')
     list_filter = ('category', 'date')
-    search_fields = ('description',)
\ No newline at end of file
+    search_fields = ('description',)
+
+@admin.register(RecurringPayment)
+class RecurringPaymentAdmin(admin.ModelAdmin):
+    list_display = ('user', 'description', 'frequency', 'average_amount', 'occurrences', 'next_expected')
+    list_filter = ('frequency',)
+    search_fields = ('user__username', 'description', 'merchant_key')
+
+@admin.register(MerchantCategory)
+class MerchantCategoryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'merchant_key', 'category', 'source', 'updated_at')
+    list_filter = ('source', 'category')
+    search_fields = ('user__username', 'merchant_key')
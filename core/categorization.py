@@ -0,0 +1,148 @@
+"""
+Transaction categorization with a per-user merchant cache.
+
+Descriptions are reduced to merchant keys (see ``core.merchants``). A key
+that has been categorized before resolves with a dict lookup; an unseen key
+is matched against category keywords, and only when none match against
+known merchants through a token index (so "ubr" finds "uber trip"). These
+answers depend only on the key, so they are cached for the rest of the run
+and saved as a ``MerchantCategory`` so later uploads hit the cache.
+
+Failing that, the keywords are tried on the rest of the normalized
+description. That match comes from text the key leaves out, so it
+categorizes that transaction only and is never cached. Keywords are never
+matched against channel prefixes, so "car" does not match "POS CARD".
+"""
+import difflib
+import logging
+import time
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .merchants import merchant_key, normalize_description
+from .models import Category, MerchantCategory
+
+logger = logging.getLogger(__name__)
+
+# Minimum difflib ratio for a merchant name to count as a variant of another
+FUZZY_CUTOFF = 0.8
+MIN_FUZZY_TOKEN_LENGTH = 3
+
+class MerchantCategorizer:
+    def __init__(self, user):
+        self.user = user
+        # User and system categories, in the order they are matched
+        self.categories = list(Category.objects.filter(Q(user=user) | Q(is_system=True)))
+        self.categories_by_id = {cat.id: cat for cat in self.categories}
+
+        self.cache = dict(
+            MerchantCategory.objects.filter(user=user).values_list('merchant_key', 'category_id')
+        )
+        # Leading token (the merchant name) -> keys with a cached category
+        self.token_index = defaultdict(list)
+        for key in self.cache:
+            self.token_index[key.split(' ')[0]].append(key)
+        self._vocabulary = None
+
+        self.new_entries = {}
+        self.stats = {'cached': 0, 'fuzzy': 0, 'keyword': 0, 'uncategorized': 0}
+        self.elapsed = 0.0
+
+    def categorize(self, description, key=None):
+        """Return (category, merchant_key) for a transaction description."""
+        started = time.perf_counter()
+        if key is None:
+            key = merchant_key(description)
+
+        if key and key in self.cache:
+            category_id, source = self.cache[key], 'cached'
+        else:
+            category_id, source = self._keyword_match(key), 'keyword'
+            if category_id is None:
+                category_id, source = self._fuzzy_match(key), 'fuzzy'
+            if category_id is not None:
+                self._remember(key, category_id, source)
+            else:
+                # Neither this match nor a miss is cached: the keyword lies
+                # outside the key, and a merchant categorized later in the run
+                # may still be found for this key by the fuzzy match
+                category_id, source = self._keyword_match(normalize_description(description)), 'keyword'
+            if category_id is None:
+                source = 'uncategorized'
+
+        self.stats[source] += 1
+        self.elapsed += time.perf_counter() - started
+        return self.categories_by_id.get(category_id), key
+
+    def _fuzzy_match(self, key):
+        if not key:
+            return None
+        name = key.split(' ')[0]
+        if len(name) < MIN_FUZZY_TOKEN_LENGTH or not self.token_index:
+            return None
+        if self._vocabulary is None:
+            self._vocabulary = list(self.token_index)
+        close = difflib.get_close_matches(name, self._vocabulary, n=1, cutoff=FUZZY_CUTOFF)
+        if not close:
+            return None
+        for candidate in self.token_index[close[0]]:
+            category_id = self.cache.get(candidate)
+            if category_id is not None:
+                return category_id
+        return None
+
+    def _keyword_match(self, text):
+        if not text:
+            return None
+        desc = text.lower()
+        for cat in self.categories:
+            if any(keyword in desc for keyword in cat.keyword_list):
+                return cat.id
+        return None
+
+    def _remember(self, key, category_id, source):
+        self.cache[key] = category_id
+        self.new_entries[key] = (category_id, source)
+        name = key.split(' ')[0]
+        if name not in self.token_index:
+            self._vocabulary = None
+        self.token_index[name].append(key)
+
+    def save(self):
+        """Persist merchants categorized during this run."""
+        MerchantCategory.objects.bulk_create(
+            [
+                MerchantCategory(user=self.user, merchant_key=key, category_id=category_id, source=source)
+                for key, (category_id, source) in self.new_entries.items()
+            ],
+            ignore_conflicts=True,
+        )
+        self.new_entries = {}
+
+    def report(self):
+        """Log cache hit rate and throughput for the run so far."""
+        total = sum(self.stats.values())
+        if not total:
+            return
+        logger.info(
+            "Categorized %d transactions for %s in %.3fs (%.0f/s): "
+            "cache hits %d (%.1f%%), fuzzy %d, keyword %d, uncategorized %d",
+            total, self.user, self.elapsed, total / self.elapsed if self.elapsed else 0,
+            self.stats['cached'], self.stats['cached'] / total * 100,
+            self.stats['fuzzy'], self.stats['keyword'], self.stats['uncategorized'],
+        )
+
+def remember_manual_category(transaction):
+    """Cache the category a user picked for a transaction's merchant."""
+    if not transaction.merchant_key or transaction.category_id is None:
+        return
+    MerchantCategory.objects.update_or_create(
+        user=transaction.uploaded_file.user,
+        merchant_key=transaction.merchant_key,
+        defaults={'category_id': transaction.category_id, 'source': 'manual'},
+    )
+
+def forget_derived_categories(user):
+    """Drop keyword and fuzzy cache entries, e.g. after categories change."""
+    MerchantCategory.objects.filter(user=user).exclude(source='manual').delete()
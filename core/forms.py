@@ -1,6 +1,26 @@
+import os
+import zipfile
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from .models import UploadedFile, Category, Transaction
 
+MAX_BATCH_FILES = 50
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+class MultipleFileField(forms.FileField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)]
+
 class UploadStatementForm(forms.ModelForm):
     class Meta:
         model = UploadedFile
@@ -26,4 +46,64 @@ class TransactionCategoryForm(forms.ModelForm):
         fields = ['category', 'notes']
         widgets = {
             'notes': forms.Textarea(attrs={'class': 'form-textarea mt-1 block w-full', 'rows': 2}),
-        }
\ No newline at end of file
+        }
+
+class BatchUploadForm(forms.Form):
+    bank_name = forms.CharField(
+        max_length=100,
+        widget=forms.TextInput(attrs={'class': 'form-input mt-1 block w-full'}),
+    )
+    files = MultipleFileField(
+        help_text="Select several PDF statements, or a single .zip archive of PDFs",
+        widget=MultipleFileInput(attrs={'class': 'form-input mt-1 block w-full', 'accept': '.pdf,.zip'}),
+    )
+
+    def clean_files(self):
+        files = self.cleaned_data['files']
+        max_statement = getattr(settings, 'MAX_STATEMENT_SIZE', 10 * 1024 * 1024)
+        max_batch = getattr(settings, 'MAX_BATCH_SIZE', 200 * 1024 * 1024)
+        count = 0
+        total_size = 0
+        for f in files:
+            ext = os.path.splitext(f.name)[1].lower()
+            if ext == '.zip':
+                if not zipfile.is_zipfile(f):
+                    raise forms.ValidationError(f"{f.name} is not a valid zip archive.")
+                f.seek(0)
+                with zipfile.ZipFile(f) as archive:
+                    members = statement_members(archive)
+                f.seek(0)
+                # Extraction never yields more than the declared size of a
+                # member, so checking the declared sizes bounds what is unpacked.
+                sizes = [(info.filename, info.file_size) for info in members]
+            elif ext == '.pdf':
+                sizes = [(f.name, f.size)]
+            else:
+                raise forms.ValidationError(f"{f.name} is not a PDF or zip file.")
+
+            for name, size in sizes:
+                if size > max_statement:
+                    raise forms.ValidationError(
+                        f"{name} is larger than the {filesizeformat(max_statement)} limit per statement."
+                    )
+            count += len(sizes)
+            total_size += sum(size for _, size in sizes)
+            if total_size > max_batch:
+                raise forms.ValidationError(
+                    f"The statements add up to more than the {filesizeformat(max_batch)} batch limit."
+                )
+        if count == 0:
+            raise forms.ValidationError("No PDF statements found in the upload.")
+        if count > MAX_BATCH_FILES:
+            raise forms.ValidationError(f"A batch can contain at most {MAX_BATCH_FILES} statements.")
+        return files
+
+def statement_members(archive):
+    """PDF entries of a zip archive, skipping directories and macOS metadata."""
+    return [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith('.pdf')
+        and not os.path.basename(info.filename).startswith('.')
+        and '__MACOSX/' not in info.filename
+    ]
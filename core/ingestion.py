@@ -0,0 +1,291 @@
+"""
+Statement ingestion: parse uploaded PDFs and store their transactions.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils import timezone
+from django.db import connections, transaction
+
+from .forms import statement_members
+from .models import UploadBatch, UploadedFile, Transaction
+from .categorization import MerchantCategorizer
+from .parsers import parse_statement
+from .reconciliation import reconcile
+from .recurring import update_recurring
+from .snapshots import build_snapshot, invalidate_snapshot
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Return the shared process pool used to parse statements."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'INGESTION_WORKERS', None) or os.cpu_count()
+            # Forking a multithreaded web process can deadlock the children;
+            # parse_statement needs no Django setup, so fresh processes work.
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('forkserver'),
+            )
+    return _executor
+
+def discard_executor(executor):
+    """Drop a broken pool so the next get_executor() call starts a new one."""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def submit_parse(uploaded_file):
+    """Queue a statement on the shared pool and return the future.
+
+    A worker that dies (for example killed for running out of memory)
+    breaks the whole pool, so a broken pool is replaced once here.
+    """
+    executor = get_executor()
+    try:
+        return executor.submit(parse_statement, uploaded_file.bank_name, uploaded_file.file.path)
+    except BrokenProcessPool:
+        discard_executor(executor)
+        return get_executor().submit(parse_statement, uploaded_file.bank_name, uploaded_file.file.path)
+
+def save_transactions(uploaded_file, transactions, categorizer=None):
+    """Reconcile and store parsed transactions, then mark the file processed.
+
+    Pass one categorizer for several files of the same user to share its
+    merchant cache. The rows, the processed flag and the recurring payment
+    index for this file's merchants are written in one transaction. A file
+    that is already processed or failed is left alone, so a batch can be
+    safely resumed. Returns whether the file was stored.
+    """
+    if categorizer is None:
+        categorizer = MerchantCategorizer(uploaded_file.user)
+
+    discrepancies = reconcile(transactions)
+    rows = []
+    for transaction_data in transactions:
+        category, key = categorizer.categorize(transaction_data['description'])
+        rows.append(Transaction(
+            uploaded_file=uploaded_file,
+            date=transaction_data['date'],
+            description=transaction_data['description'],
+            merchant_key=key,
+            amount=transaction_data['amount'],
+            category=category,
+            balance=transaction_data['balance'],
+        ))
+
+    with transaction.atomic():
+        claimed = UploadedFile.objects.filter(
+            pk=uploaded_file.pk, processed=False, error_message=''
+        ).update(processed=True, discrepancies=discrepancies)
+        if not claimed:
+            return False
+        Transaction.objects.bulk_create(rows)
+        categorizer.save()
+        update_recurring(uploaded_file.user, {row.merchant_key for row in rows if row.merchant_key})
+
+    uploaded_file.processed = True
+    uploaded_file.discrepancies = discrepancies
+    categorizer.report()
+    invalidate_snapshot(uploaded_file.user)
+    return True
+
+def ingest_file(uploaded_file):
+    """Parse and store a single uploaded statement in the current process."""
+    transactions = parse_statement(uploaded_file.bank_name, uploaded_file.file.path)
+    save_transactions(uploaded_file, transactions)
+    build_snapshot(uploaded_file.user)
+
+def remove_stored_file(uploaded_file):
+    """Delete the statement PDF from storage, keeping the database row."""
+    if uploaded_file.file and os.path.exists(uploaded_file.file.path):
+        os.remove(uploaded_file.file.path)
+
+# Raised while reading a zip member: bad CRC or truncated data, encryption,
+# or an unsupported compression method
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+def extract_member(archive, info):
+    """Copy a zip member to a temporary upload file.
+
+    The member is streamed rather than read into memory, and storage moves
+    the temporary file into place, so a member that cannot be read fails
+    before anything is stored.
+    """
+    extracted = TemporaryUploadedFile(os.path.basename(info.filename), 'application/pdf', info.file_size, None)
+    try:
+        with archive.open(info) as member:
+            shutil.copyfileobj(member, extracted)
+    except BaseException:
+        extracted.close()
+        raise
+    return extracted
+
+def create_batch(user, bank_name, files):
+    """Store uploaded PDFs, and the PDFs inside any zip archives, as a batch.
+
+    Raises ValueError if a zip member cannot be read; the batch and any
+    files already stored for it are removed first.
+    """
+    batch = UploadBatch.objects.create(user=user, bank_name=bank_name)
+    try:
+        for upload in files:
+            if upload.name.lower().endswith('.zip'):
+                upload.seek(0)
+                with zipfile.ZipFile(upload) as archive:
+                    for info in statement_members(archive):
+                        try:
+                            content = extract_member(archive, info)
+                        except ARCHIVE_ERRORS as e:
+                            raise ValueError(f"{info.filename} in {upload.name} could not be read: {e}") from e
+                        with content:
+                            UploadedFile.objects.create(user=user, batch=batch, bank_name=bank_name, file=content)
+            else:
+                UploadedFile.objects.create(user=user, batch=batch, bank_name=bank_name, file=upload)
+    except Exception:
+        discard_batch(batch)
+        raise
+    return batch
+
+def discard_batch(batch):
+    """Delete a batch along with its files' rows and stored PDFs."""
+    for uploaded_file in batch.files.all():
+        remove_stored_file(uploaded_file)
+    batch.delete()
+
+def process_batch(batch_id):
+    """Parse every pending file of a batch in parallel and store the results.
+
+    Parsing runs in the shared process pool; results are written to the
+    database from this thread as each file finishes, so batch progress is
+    visible while the rest are still being parsed.
+    """
+    batch = UploadBatch.objects.select_related('user').get(pk=batch_id)
+    categorizer = MerchantCategorizer(batch.user)
+    pending = batch.files.filter(processed=False, error_message='')
+
+    futures = {}
+    for uploaded_file in pending:
+        try:
+            futures[submit_parse(uploaded_file)] = uploaded_file
+        except Exception as e:
+            record_failure(uploaded_file, e, keep_file=True)
+
+    for future in as_completed(futures):
+        uploaded_file = futures[future]
+        try:
+            transactions = future.result()
+        except BrokenProcessPool as e:
+            # The pool failed, not the statement; the next submit replaces it
+            record_failure(uploaded_file, e, keep_file=True)
+            continue
+        except Exception as e:
+            record_failure(uploaded_file, e)
+            continue
+        try:
+            save_transactions(uploaded_file, transactions, categorizer)
+        except Exception as e:
+            record_failure(uploaded_file, e, keep_file=True)
+
+    build_snapshot(batch.user)
+
+def record_failure(uploaded_file, error, keep_file=False):
+    """Keep the error on the file's row.
+
+    A PDF the parser rejected is deleted; pass ``keep_file`` when the failure
+    was not the statement's fault (storing the results, or the process pool
+    itself failing), so the statement can be retried.
+    """
+    uploaded_file.error_message = str(error) or error.__class__.__name__
+    uploaded_file.save(update_fields=['error_message'])
+    if not keep_file:
+        remove_stored_file(uploaded_file)
+
+async def aprocess_batch(batch_id):
+    """Async counterpart of process_batch for the ASGI event loop.
+
+    Parsing is awaited on the shared process pool, so no thread is held
+    while statements are being parsed; only the database writes are
+    handed to Django's sync thread.
+    """
+    try:
+        batch = await UploadBatch.objects.select_related('user').aget(pk=batch_id)
+        categorizer = await sync_to_async(MerchantCategorizer)(batch.user)
+        pending = [
+            uploaded_file
+            async for uploaded_file in batch.files.filter(processed=False, error_message='')
+        ]
+        await asyncio.gather(*(_aingest(uploaded_file, categorizer) for uploaded_file in pending))
+        await sync_to_async(build_snapshot)(batch.user)
+    finally:
+        # Outside a request the sync calls run on a thread of their own,
+        # whose connection would otherwise stay open
+        await sync_to_async(connections.close_all)()
+
+async def _aingest(uploaded_file, categorizer):
+    try:
+        future = submit_parse(uploaded_file)
+    except Exception as e:
+        await sync_to_async(record_failure)(uploaded_file, e, keep_file=True)
+        return
+    try:
+        transactions = await asyncio.wrap_future(future)
+    except BrokenProcessPool as e:
+        # The pool failed, not the statement; the next submit replaces it
+        await sync_to_async(record_failure)(uploaded_file, e, keep_file=True)
+        return
+    except Exception as e:
+        await sync_to_async(record_failure)(uploaded_file, e)
+        return
+    try:
+        await sync_to_async(save_transactions)(uploaded_file, transactions, categorizer)
+    except Exception as e:
+        await sync_to_async(record_failure)(uploaded_file, e, keep_file=True)
+
+def stale_batches(older_than):
+    """Batches with files still pending after ``older_than`` (a timedelta).
+
+    Background processing does not survive a worker restart, so these are
+    files whose processing was interrupted.
+    """
+    cutoff = timezone.now() - older_than
+    return UploadBatch.objects.filter(
+        files__processed=False, files__error_message='', files__uploaded_at__lt=cutoff
+    ).distinct()
+
+def _run_batch(batch_id):
+    try:
+        process_batch(batch_id)
+    finally:
+        connections.close_all()
+
+def start_batch(batch):
+    """Process a batch in the background so the request can return."""
+    thread = threading.Thread(target=_run_batch, args=(batch.pk,), daemon=True)
+    thread.start()
+    return thread
+
+# Strong references to running batch tasks; the event loop only keeps weak ones.
+_background_tasks = set()
+
+def astart_batch(batch):
+    """Schedule a batch on the running event loop so the request can return."""
+    task = asyncio.get_running_loop().create_task(aprocess_batch(batch.pk))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
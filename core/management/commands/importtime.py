@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Loaded only by ingestion and analytics code, never when a web worker starts
+HEAVY_MODULES = ['pdfplumber', 'pdfminer', 'numpy', 'pandas', 'matplotlib', 'PIL']
+
+STARTUP_CODE = 'import django; django.setup(); import {target}'
+
+class Command(BaseCommand):
+    help = (
+        'Measures web worker import time with python -X importtime and fails '
+        'if heavy parser or analytics libraries are imported at startup'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='bankstatements.urls',
+                            help='Module a worker imports to serve requests')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail if the total import time exceeds this many milliseconds')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs to take the fastest of')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Number of slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        runs = [self.measure(options['target']) for _ in range(max(options['repeat'], 1))]
+        total_us, entries = min(runs, key=lambda run: run[0])
+
+        self.stdout.write(f"Import time for {options['target']}: {total_us / 1000:.1f} ms")
+        top_level = sorted((e for e in entries if e[2] == 0), key=lambda e: e[1], reverse=True)
+        for name, cumulative, _ in top_level[:options['top']]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+        imported = {name.split('.')[0] for name, _, _ in entries}
+        heavy = [module for module in HEAVY_MODULES if module in imported]
+        if heavy:
+            raise CommandError(f"Heavy modules imported at startup: {', '.join(heavy)}")
+        if options['budget_ms'] is not None and total_us / 1000 > options['budget_ms']:
+            raise CommandError(
+                f"Import time {total_us / 1000:.1f} ms exceeds budget of {options['budget_ms']:.1f} ms"
+            )
+
+        self.stdout.write(self.style.SUCCESS('No heavy modules imported at startup'))
+
+    def measure(self, target):
+        """Run a fresh interpreter and parse its -X importtime report.
+
+        Returns the total self time in microseconds and a list of
+        (module, cumulative microseconds, nesting depth) entries.
+        """
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'bankstatements.settings')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE.format(target=target)],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+
+        total = 0
+        entries = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            total += int(self_us)
+            # Names follow one space, plus two more per level of nesting
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((name.strip(), int(cumulative_us), depth))
+        return total, entries
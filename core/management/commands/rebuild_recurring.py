@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from core.merchants import merchant_key
+from core.models import Transaction
+from core.recurring import update_recurring
+
+class Command(BaseCommand):
+    help = 'Recomputes merchant keys and rebuilds the recurring payment index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Only rebuild for this username')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(username=options['user'])
+
+        # Keys are recomputed for every row so older rows pick up changes
+        # to merchant normalization.
+        transactions = Transaction.objects.filter(uploaded_file__user__in=users)
+        batch = []
+        for transaction in transactions.only('id', 'description', 'merchant_key').iterator(chunk_size=2000):
+            key = merchant_key(transaction.description)
+            if key == transaction.merchant_key:
+                continue
+            transaction.merchant_key = key
+            batch.append(transaction)
+            if len(batch) >= 2000:
+                Transaction.objects.bulk_update(batch, ['merchant_key'])
+                batch = []
+        if batch:
+            Transaction.objects.bulk_update(batch, ['merchant_key'])
+
+        for user in users:
+            found = update_recurring(user)
+            self.stdout.write(f'{user.username}: {len(found)} recurring payments')
+
+        self.stdout.write(self.style.SUCCESS('Successfully rebuilt recurring payment index'))
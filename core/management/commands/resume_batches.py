@@ -0,0 +1,18 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from core.ingestion import process_batch, stale_batches
+
+class Command(BaseCommand):
+    help = 'Processes batch files left pending by an interrupted worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=30,
+                            help='Minutes a file must have been pending for')
+
+    def handle(self, *args, **options):
+        batches = list(stale_batches(timedelta(minutes=options['older_than'])))
+        for batch in batches:
+            self.stdout.write(f'Resuming {batch}')
+            process_batch(batch.pk)
+
+        self.stdout.write(self.style.SUCCESS(f'Resumed {len(batches)} batches'))
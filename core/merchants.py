@@ -0,0 +1,54 @@
+"""
+Merchant normalization for transaction descriptions.
+"""
+import re
+
+# Payment channel markers banks put in front of the merchant name, and the
+# "to"/"from" that often follows them on transfers
+_CHANNEL_PREFIX = re.compile(
+    r'^(?:pos|web|ecom|nip|nibss|trf|tfr|transfer|atm|wdl|withdrawal|ussd|mob|inb|ib'
+    r'|card|purchase|pur|debit|dr|cr|to|from|at)\b[\s:/*\-]*'
+)
+_DATES = re.compile(r'\b\d{1,4}[/-](?:\d{1,2}|[a-z]{3})[/-]\d{1,4}\b')
+# Punctuation that joins a name to a reference, as in "DOE/REF123" or "UBER*TRIP"
+_SEPARATORS = re.compile(r'[/\\*:;,.#@|_\-]+')
+# Any token holding a digit: references, card masks, terminal ids, times
+_REFERENCES = re.compile(r'\S*\d\S*')
+_NON_ALPHA = re.compile(r'[^a-z ]+')
+_SPACES = re.compile(r'\s+')
+# Company suffixes, web and location noise that varies between occurrences
+_NOISE_TOKENS = {
+    'ltd', 'limited', 'plc', 'bv', 'inc', 'llc', 'co', 'com', 'www', 'ref',
+    'ng', 'nga', 'nig', 'nigeria', 'lagos', 'lag', 'abuja', 'abj', 'ph',
+}
+
+MAX_KEY_TOKENS = 3
+# Length of the merchant_key model fields
+MAX_KEY_LENGTH = 100
+
+def normalize_description(description: str) -> str:
+    """Strip channel prefixes, dates, references and punctuation.
+
+    "POS PURCHASE UBER *TRIP 12/03/2024 REF:8812" becomes "uber trip".
+    """
+    text = description.lower().strip()
+    while True:
+        stripped = _CHANNEL_PREFIX.sub('', text, count=1)
+        if stripped == text:
+            break
+        text = stripped
+    text = _DATES.sub(' ', text)
+    text = _SEPARATORS.sub(' ', text)
+    text = _REFERENCES.sub(' ', text)
+    text = _NON_ALPHA.sub(' ', text)
+    tokens = [t for t in _SPACES.split(text) if t and t not in _NOISE_TOKENS]
+    return ' '.join(tokens)
+
+def merchant_key(description: str) -> str:
+    """Reduce a description to a stable key shared by all its occurrences.
+
+    Only the leading words of the normalized description are kept, so
+    "NETFLIX.COM 0423 LAGOS" and "POS NETFLIX.COM 0523" share "netflix".
+    """
+    key = ' '.join(normalize_description(description).split(' ')[:MAX_KEY_TOKENS])
+    return key[:MAX_KEY_LENGTH].rstrip()
@@ -26,23 +26,69 @@ class Category(models.Model):
     def keyword_list(self):
         return [k.strip().lower() for k in self.keywords.split(',') if k.strip()]
 
+class UploadBatch(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    bank_name = models.CharField(max_length=100)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Upload batches"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.bank_name} batch - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
+
+    def progress(self):
+        return self._summarize(self.files.values_list('processed', 'error_message'))
+
+    async def aprogress(self):
+        return self._summarize([row async for row in self.files.values_list('processed', 'error_message')])
+
+    @staticmethod
+    def _summarize(files):
+        files = list(files)
+        total = len(files)
+        processed = sum(1 for done, _ in files if done)
+        failed = sum(1 for done, error in files if error and not done)
+        pending = sum(1 for done, error in files if not done and not error)
+        return {
+            'total': total,
+            'processed': processed,
+            'failed': failed,
+            'pending': pending,
+            'percentage': int((total - pending) / total * 100) if total else 100,
+        }
+
 class UploadedFile(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    batch = models.ForeignKey(UploadBatch, on_delete=models.CASCADE, null=True, blank=True, related_name='files')
     file = models.FileField(upload_to='statements/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
     bank_name = models.CharField(max_length=100)
     processed = models.BooleanField(default=False)
+    error_message = models.TextField(blank=True)
+    discrepancies = models.JSONField(default=list, blank=True, help_text="Row ranges where the running balance does not reconcile")
 
     def __str__(self):
         return f"{self.bank_name} statement - {self.uploaded_at.strftime('%Y-%m-%d')}"
 
+    @property
+    def balance_mismatches(self):
+        # Ranges that only lack balances could not be checked, so they are left out
+        return [d for d in self.discrepancies if d.get('mismatched_rows', 1)]
+
+    @property
+    def reconciled(self):
+        return self.processed and not self.balance_mismatches
+
 class Transaction(models.Model):
     uploaded_file = models.ForeignKey(UploadedFile, on_delete=models.CASCADE)
     date = models.DateField()
     description = models.TextField()
+    merchant_key = models.CharField(max_length=100, blank=True, db_index=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
-    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    balance = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -51,4 +97,75 @@ class Transaction(models.Model):
         return f"{self.date} - {self.description[:30]} - ₦{self.amount}"
 
     class Meta:
-        ordering = ['-date']
\ No newline at end of file
+        ordering = ['-date']
+
+class MerchantCategory(models.Model):
+    SOURCE_CHOICES = [
+        ('manual', 'Set by user'),
+        ('keyword', 'Keyword match'),
+        ('fuzzy', 'Similar merchant'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    merchant_key = models.CharField(max_length=100)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Merchant categories"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'merchant_key'],
+                name='unique_merchant_category_per_user'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.merchant_key} -> {self.category}"
+
+class RecurringPayment(models.Model):
+    FREQUENCY_CHOICES = [
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+        ('quarterly', 'Quarterly'),
+        ('yearly', 'Yearly'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    merchant_key = models.CharField(max_length=100)
+    description = models.CharField(max_length=255, help_text="Description of the most recent occurrence")
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    frequency = models.CharField(max_length=20, choices=FREQUENCY_CHOICES)
+    average_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    occurrences = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    next_expected = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['next_expected']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'merchant_key'],
+                name='unique_recurring_payment_per_user'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.description[:30]} - {self.get_frequency_display()} ₦{self.average_amount}"
+
+class AnalyticsSnapshot(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='analytics_snapshot')
+    data_version = models.PositiveIntegerField(default=1, help_text="Bumped whenever the user's transactions change")
+    built_version = models.PositiveIntegerField(default=0, help_text="Data version the snapshot files were built from")
+    rows = models.PositiveIntegerField(default=0)
+    built_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user} snapshot v{self.built_version}"
+
+    @property
+    def is_stale(self):
+        return self.built_version != self.data_version
@@ -13,4 +13,15 @@ BANK_PARSERS = {
     'Zenith Bank': ZenithBankParser,
     'GTBank': GTBankParser,
     'UBA': UBAParser,
-}
\ No newline at end of file
+}
+
+
+def parse_statement(bank_name, pdf_path):
+    """Parse a statement PDF with the parser registered for bank_name.
+
+    Kept free of Django imports so it can run in ingestion worker processes.
+    """
+    parser_class = BANK_PARSERS.get(bank_name)
+    if not parser_class:
+        raise ValueError(f"No parser available for {bank_name}")
+    return parser_class(pdf_path).parse()
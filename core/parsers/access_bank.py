@@ -11,12 +11,12 @@ class AccessBankParser(BaseStatementParser):
     def parse_page(self, text: str) -> None:
         """Parse Access Bank statement page."""
         # Access Bank transaction pattern
-        pattern = r'(\d{2}-[A-Za-z]{3}-\d{2})\s+(.*?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})'
+        pattern = r'(\d{2}-[A-Za-z]{3}-\d{2})\s+(.*?)\s+([\d,]+\.\d{2})\s+([\d,]+\.\d{2})(?:\s+([\d,]+\.\d{2}))?'
         
         for line in text.split('\n'):
             match = re.search(pattern, line)
             if match:
-                date_str, description, debit_str, credit_str = match.groups()
+                date_str, description, debit_str, credit_str, balance_str = match.groups()
                 
                 try:
                     date = self.parse_date(date_str)
@@ -35,7 +35,8 @@ class AccessBankParser(BaseStatementParser):
                         'description': description.strip(),
                         'amount': amount,
                         'category': category,
-                        'balance': self.clean_amount(credit_str)
+                        # Some statement layouts omit the balance column
+                        'balance': self.clean_amount(balance_str) if balance_str else None
                     }
                     
                     self.transactions.append(transaction)
@@ -5,7 +5,6 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from decimal import Decimal
 from typing import List, Dict, Any
-import pdfplumber
 import re
 
 class BaseStatementParser(ABC):
@@ -15,6 +14,9 @@ class BaseStatementParser(ABC):
 
     def parse(self) -> List[Dict[str, Any]]:
         """Parse the PDF and return a list of transactions."""
+        # Imported here so only ingestion code paths load pdfplumber/pdfminer
+        import pdfplumber
+
         with pdfplumber.open(self.pdf_path) as pdf:
             for page in pdf.pages:
                 text = page.extract_text()
@@ -42,6 +44,7 @@ class BaseStatementParser(ABC):
                 '%Y-%m-%d',
                 '%d/%m/%y',
                 '%d-%b-%Y',
+                '%d-%b-%y',
             ]
             for fmt in formats:
                 try:
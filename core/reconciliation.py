@@ -0,0 +1,85 @@
+"""
+Running balance reconciliation for parsed statements.
+
+Each row should satisfy ``previous_balance + amount == balance``. Rows that
+break the chain point at a missing transaction (one mismatch) or a misparsed
+amount/balance (mismatches on consecutive rows), so mismatching rows are
+grouped into contiguous ranges before being reported. Rows without a
+balance cannot be checked and are reported too, but a range made only of
+such rows is not a mismatch.
+"""
+from decimal import Decimal
+from typing import List, Dict, Any
+
+def _to_kobo(values, count):
+    """Decimal values as an int64 array of kobo; None becomes 0 and is masked."""
+    import numpy as np
+
+    missing = np.fromiter((v is None for v in values), dtype=bool, count=count)
+    kobo = np.fromiter(
+        (0 if v is None else int(Decimal(v) * 100) for v in values),
+        dtype=np.int64,
+        count=count,
+    )
+    return kobo, missing
+
+def _chain_errors(amounts, balances, missing):
+    """Per-row difference between the stated and the expected balance.
+
+    Rows are in chronological order. The first row has no previous balance
+    and rows next to a missing balance cannot be checked; both count as 0.
+    """
+    import numpy as np
+
+    errors = np.zeros(len(amounts), dtype=np.int64)
+    checkable = ~missing[1:] & ~missing[:-1]
+    errors[1:] = np.where(checkable, balances[1:] - balances[:-1] - amounts[1:], 0)
+    return errors
+
+def reconcile(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Check the running balance of a statement and return discrepancy ranges.
+
+    ``transactions`` are parser dicts in statement order, which may be oldest
+    or newest first; the direction with fewer breaks in the chain is used.
+    Each range gives the first and last row index (in statement order), their
+    dates, the number of rows, how many of them break the chain and the
+    unexplained difference in naira. A statement without any balances cannot
+    be checked and yields no ranges.
+    """
+    import numpy as np
+
+    count = len(transactions)
+    if count == 0:
+        return []
+
+    amounts, _ = _to_kobo([t['amount'] for t in transactions], count)
+    balances, missing = _to_kobo([t.get('balance') for t in transactions], count)
+    if missing.all():
+        return []
+
+    forward = _chain_errors(amounts, balances, missing)
+    backward = _chain_errors(amounts[::-1], balances[::-1], missing[::-1])[::-1]
+    errors = forward if np.count_nonzero(forward) <= np.count_nonzero(backward) else backward
+
+    flagged = (errors != 0) | missing
+    if not flagged.any():
+        return []
+
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flagged.view(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2] - 1
+    totals = np.add.reduceat(errors, starts)
+    mismatched = np.add.reduceat((errors != 0).astype(np.int64), starts)
+
+    return [
+        {
+            'first_row': int(start),
+            'last_row': int(end),
+            'start_date': transactions[start]['date'].strftime('%Y-%m-%d'),
+            'end_date': transactions[end]['date'].strftime('%Y-%m-%d'),
+            'rows': int(end - start + 1),
+            'missing_balance': bool(missing[start:end + 1].any()),
+            'mismatched_rows': int(mismatches),
+            'difference': str((Decimal(int(total)) / 100).quantize(Decimal('0.01'))),
+        }
+        for start, end, total, mismatches in zip(starts, ends, totals, mismatched)
+    ]
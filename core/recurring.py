@@ -0,0 +1,101 @@
+"""
+Recurring payment detection.
+
+Debits are grouped by merchant key in a single pass, then each group's
+intervals and amounts are checked against the known billing periods.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import RecurringPayment, Transaction
+
+# frequency -> (nominal interval in days, allowed deviation in days)
+PERIODS = {
+    'weekly': (7, 2),
+    'monthly': (30, 4),
+    'quarterly': (91, 10),
+    'yearly': (365, 15),
+}
+MIN_OCCURRENCES = 3
+# Share of intervals (and of amounts) that must match for a group to count
+MIN_REGULARITY = 0.75
+AMOUNT_TOLERANCE = 0.2
+
+def detect_period(ordinals, amounts):
+    """Return the frequency name for a group of debits, or None.
+
+    ``ordinals`` are sorted date ordinals and ``amounts`` the matching
+    positive amounts, both as NumPy arrays.
+    """
+    import numpy as np
+
+    if len(ordinals) < MIN_OCCURRENCES:
+        return None
+
+    intervals = np.diff(ordinals)
+    median_amount = np.median(amounts)
+    steady = np.abs(amounts - median_amount) <= median_amount * AMOUNT_TOLERANCE
+    if steady.mean() < MIN_REGULARITY:
+        return None
+
+    median_interval = np.median(intervals)
+    for frequency, (days, slack) in PERIODS.items():
+        if abs(median_interval - days) <= slack:
+            regular = np.abs(intervals - days) <= slack
+            if regular.mean() >= MIN_REGULARITY:
+                return frequency
+    return None
+
+def find_recurring(user, merchant_keys=None):
+    """Detect recurring debits for a user, optionally limited to some merchants."""
+    import numpy as np
+
+    debits = Transaction.objects.filter(uploaded_file__user=user, amount__lt=0).exclude(merchant_key='')
+    if merchant_keys is not None:
+        debits = debits.filter(merchant_key__in=merchant_keys)
+
+    groups = defaultdict(list)
+    rows = debits.order_by('date').values_list('merchant_key', 'date', 'amount', 'description', 'category_id')
+    for key, date, amount, description, category_id in rows:
+        groups[key].append((date, amount, description, category_id))
+
+    found = []
+    for key, entries in groups.items():
+        ordinals = np.fromiter((e[0].toordinal() for e in entries), dtype=np.int64, count=len(entries))
+        amounts = np.fromiter((-e[1] for e in entries), dtype=np.float64, count=len(entries))
+        frequency = detect_period(ordinals, amounts)
+        if not frequency:
+            continue
+
+        last_date, _, description, category_id = entries[-1]
+        found.append(RecurringPayment(
+            user=user,
+            merchant_key=key,
+            description=description[:255],
+            category_id=category_id,
+            frequency=frequency,
+            average_amount=(sum(-e[1] for e in entries) / len(entries)).quantize(Decimal('0.01')),
+            occurrences=len(entries),
+            first_date=entries[0][0],
+            last_date=last_date,
+            next_expected=last_date + timedelta(days=PERIODS[frequency][0]),
+        ))
+    return found
+
+def update_recurring(user, merchant_keys=None):
+    """Refresh the user's recurring payment index.
+
+    With ``merchant_keys`` only those merchants are recomputed, which is how
+    each upload updates the index; without them the whole index is rebuilt.
+    """
+    found = find_recurring(user, merchant_keys)
+    existing = RecurringPayment.objects.filter(user=user)
+    if merchant_keys is not None:
+        existing = existing.filter(merchant_key__in=merchant_keys)
+    with transaction.atomic():
+        existing.delete()
+        RecurringPayment.objects.bulk_create(found)
+    return found
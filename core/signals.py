@@ -0,0 +1,31 @@
+"""
+Keep analytics snapshots in step with transaction changes made outside ingestion.
+
+Ingestion bulk-creates rows, which sends no signals, and marks the snapshot
+stale itself; these receivers cover edits and deletes, including those made
+through the admin and cascades from deleting a statement or a user.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Transaction, UploadedFile
+from .snapshots import invalidate_snapshot
+
+def _deleted_directly(origin, model):
+    """Whether a delete started from ``model`` rows rather than cascading to them."""
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, **kwargs):
+    invalidate_snapshot(instance.uploaded_file.user_id)
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, origin=None, **kwargs):
+    # A cascade from a statement is handled once by statement_deleted
+    # instead of once per row
+    if _deleted_directly(origin, Transaction):
+        invalidate_snapshot(instance.uploaded_file.user_id)
+
+@receiver(post_delete, sender=UploadedFile)
+def statement_deleted(sender, instance, **kwargs):
+    invalidate_snapshot(instance.user_id)
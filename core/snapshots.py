@@ -0,0 +1,226 @@
+"""
+Per-user columnar snapshots of transactions for analytics.
+
+Each snapshot is a directory of ``.npy`` columns (date, amount, category,
+balance) sorted by date and opened with memory mapping, so analytics can
+scan a user's full history without going through the ORM. Snapshots are
+versioned by ``AnalyticsSnapshot``: ingestion and edits bump the data
+version, and a stale snapshot is rebuilt the next time it is loaded.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AnalyticsSnapshot, Category, Transaction
+
+COLUMNS = ('date', 'amount', 'category', 'balance')
+# Stored for a missing category or balance
+MISSING = -2 ** 63  # numpy.iinfo(numpy.int64).min
+
+def snapshot_root(user_id):
+    return os.path.join(getattr(settings, 'SNAPSHOT_ROOT', settings.BASE_DIR / 'snapshots'), str(user_id))
+
+def snapshot_path(user_id, version):
+    return os.path.join(snapshot_root(user_id), f'v{version}')
+
+class ColumnarSnapshot:
+    """Read-only, memory-mapped columns of one user's transactions.
+
+    ``date`` is ``datetime64[D]``; ``amount`` and ``balance`` are int64 kobo;
+    ``category`` is the category id. Missing values are ``MISSING``.
+    """
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        for column in COLUMNS:
+            setattr(self, column, np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.date)
+
+    def since(self, start_date):
+        """Slice bounds of the rows on or after start_date (rows are date sorted)."""
+        import numpy as np
+
+        start = np.searchsorted(self.date, np.datetime64(start_date, 'D'), side='left')
+        return slice(int(start), len(self))
+
+def invalidate_snapshot(user):
+    """Mark the user's snapshot stale after their transactions changed.
+
+    ``user`` may be a user or a user id.
+    """
+    AnalyticsSnapshot.objects.filter(user=user).update(data_version=F('data_version') + 1)
+
+def _kobo(value):
+    return MISSING if value is None else int(value * 100)
+
+def build_snapshot(user):
+    """Write a fresh snapshot for the user and record it as current."""
+    import numpy as np
+
+    snapshot, _ = AnalyticsSnapshot.objects.get_or_create(user=user)
+    # Read the version before scanning so changes made during the scan
+    # leave the snapshot stale rather than silently missing.
+    version = snapshot.data_version
+    previous = snapshot.built_version
+
+    rows = list(
+        Transaction.objects.filter(uploaded_file__user=user)
+        .order_by('date', 'id')
+        .values_list('date', 'amount', 'category_id', 'balance')
+    )
+    count = len(rows)
+    columns = {
+        'date': np.array([r[0] for r in rows], dtype='datetime64[D]'),
+        'amount': np.fromiter((_kobo(r[1]) for r in rows), dtype=np.int64, count=count),
+        'category': np.fromiter((MISSING if r[2] is None else r[2] for r in rows), dtype=np.int64, count=count),
+        'balance': np.fromiter((_kobo(r[3]) for r in rows), dtype=np.int64, count=count),
+    }
+
+    root = snapshot_root(user.pk)
+    os.makedirs(root, exist_ok=True)
+    target = snapshot_path(user.pk, version)
+    staging = tempfile.mkdtemp(dir=root, prefix='.build-')
+    for column, values in columns.items():
+        np.save(os.path.join(staging, f'{column}.npy'), values)
+    if not _publish(staging, target, columns):
+        shutil.rmtree(staging, ignore_errors=True)
+
+    AnalyticsSnapshot.objects.filter(pk=snapshot.pk, built_version__lt=version).update(
+        built_version=version, rows=count, built_at=timezone.now()
+    )
+    # The previous version may still be opened by a reader that looked up
+    # the snapshot before this build, so only older ones are removed.
+    _remove_old_versions(user.pk, min(previous, version))
+    return ColumnarSnapshot(target)
+
+def _publish(staging, target, columns):
+    """Move a built snapshot into place; returns False if an equal one is there.
+
+    Another worker may already have published this version. A directory
+    left from an earlier database with the same user id and version holds
+    other data, so it is only kept if its columns match.
+    """
+    import numpy as np
+
+    try:
+        os.rename(staging, target)
+        return True
+    except OSError:
+        pass
+    try:
+        existing = ColumnarSnapshot(target)
+        if all(np.array_equal(getattr(existing, column), values) for column, values in columns.items()):
+            return False
+    except (OSError, ValueError):
+        pass
+    shutil.rmtree(target, ignore_errors=True)
+    try:
+        os.rename(staging, target)
+        return True
+    except OSError:
+        # Published again by another worker in the meantime
+        return False
+
+def _remove_old_versions(user_id, current):
+    root = snapshot_root(user_id)
+    for name in os.listdir(root):
+        if name.startswith('v') and name[1:].isdigit() and int(name[1:]) < current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def load_snapshot(user):
+    """Open the user's snapshot, rebuilding it first if it is stale."""
+    for attempt in range(2):
+        snapshot = AnalyticsSnapshot.objects.filter(user=user).first()
+        if snapshot is None or snapshot.is_stale:
+            break
+        try:
+            return ColumnarSnapshot(snapshot_path(user.pk, snapshot.built_version))
+        except FileNotFoundError:
+            # Removed after a newer build; look the current version up again
+            continue
+    return build_snapshot(user)
+
+def _naira(kobo):
+    return (Decimal(int(round(kobo))) / 100).quantize(Decimal('0.01'))
+
+def summarize(snapshot, days=None):
+    """Dashboard statistics and category, monthly and weekly totals from a snapshot.
+
+    Returns the same structure as the ORM based dashboard aggregates, limited
+    to the last ``days`` days when given.
+    """
+    import numpy as np
+
+    rows = snapshot.since(timezone.now().date() - timedelta(days=days)) if days else slice(None)
+    dates = snapshot.date[rows]
+    amounts = snapshot.amount[rows]
+    categories = snapshot.category[rows]
+
+    debit = amounts < 0
+    credit = amounts > 0
+    count = len(amounts)
+    stats = {
+        'total_spent': abs(_naira(amounts[debit].sum())),
+        'total_income': _naira(amounts[credit].sum()),
+        'avg_transaction': abs(_naira(amounts.sum() / count)) if count else 0,
+        'transaction_count': count,
+        'largest_expense': abs(_naira(amounts[debit].min())) if debit.any() else 0,
+        'largest_income': _naira(amounts[credit].max()) if credit.any() else 0,
+    }
+
+    spend_ids, spend_index = np.unique(categories[debit], return_inverse=True)
+    spend_totals = np.bincount(spend_index, weights=amounts[debit], minlength=len(spend_ids))
+    spend_counts = np.bincount(spend_index, minlength=len(spend_ids))
+    names = dict(Category.objects.filter(id__in=spend_ids.tolist()).values_list('id', 'name'))
+    total_spending = abs(spend_totals.sum())
+    category_totals = [
+        {
+            'category__name': names.get(int(category_id)),
+            'total': abs(_naira(total)),
+            'count': int(n),
+            'avg': _naira(total / n),
+            'percentage': float(abs(total) / total_spending * 100) if total_spending else 0,
+        }
+        for category_id, total, n in sorted(zip(spend_ids, spend_totals, spend_counts), key=lambda c: c[1])
+    ]
+
+    months, month_index = np.unique(dates.astype('datetime64[M]'), return_inverse=True)
+    expenses = np.bincount(month_index, weights=np.where(debit, amounts, 0), minlength=len(months))
+    income = np.bincount(month_index, weights=np.where(credit, amounts, 0), minlength=len(months))
+    counts = np.bincount(month_index, minlength=len(months))
+    monthly_totals = [
+        {
+            'month': month.astype('datetime64[D]').item(),
+            'expenses': _naira(exp) if exp else None,
+            'income': _naira(inc) if inc else None,
+            'transaction_count': int(n),
+        }
+        for month, exp, inc, n in zip(months, expenses, income, counts)
+    ]
+
+    # Weeks start on Monday, as with TruncWeek; day 0 (1970-01-01) was a Thursday
+    days_since_epoch = dates[debit].astype(np.int64)
+    week_starts = (days_since_epoch - (days_since_epoch + 3) % 7).astype('datetime64[D]')
+    weeks, week_index = np.unique(week_starts, return_inverse=True)
+    week_spending = np.bincount(week_index, weights=amounts[debit], minlength=len(weeks))
+    weekly_totals = [
+        {'week': week.item(), 'total': _naira(total)}
+        for week, total in zip(weeks, week_spending)
+    ]
+
+    return {
+        'stats': stats,
+        'category_totals': category_totals,
+        'monthly_totals': monthly_totals,
+        'weekly_totals': weekly_totals,
+    }
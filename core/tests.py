@@ -0,0 +1,205 @@
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.merchants import merchant_key
+from core.models import Category, Transaction, UploadedFile
+from core.parsers.access_bank import AccessBankParser
+from core.reconciliation import reconcile
+from core.recurring import detect_period
+from core.snapshots import build_snapshot, summarize
+
+class ImportTimeTests(SimpleTestCase):
+    def test_web_worker_imports_no_heavy_modules(self):
+        # Runs python -X importtime on the URLconf a worker loads
+        try:
+            call_command('importtime', repeat=1, stdout=StringIO())
+        except CommandError as e:
+            self.fail(str(e))
+
+def statement(rows, start=date(2024, 1, 1)):
+    """Parser dicts from (amount, balance) pairs, one day apart."""
+    return [
+        {
+            'date': start + timedelta(days=i),
+            'description': f'ROW {i}',
+            'amount': Decimal(amount),
+            'balance': None if balance is None else Decimal(balance),
+        }
+        for i, (amount, balance) in enumerate(rows)
+    ]
+
+class ReconcileTests(SimpleTestCase):
+    ROWS = [('100.00', '100.00'), ('10.00', '110.00'), ('-5.50', '104.50'), ('-4.50', '100.00')]
+
+    def test_oldest_first_chain(self):
+        self.assertEqual(reconcile(statement(self.ROWS)), [])
+
+    def test_newest_first_chain(self):
+        self.assertEqual(reconcile(statement(self.ROWS[::-1])), [])
+
+    def test_empty_statement(self):
+        self.assertEqual(reconcile([]), [])
+
+    def test_missing_transaction(self):
+        # A 20.00 debit between the last two rows is missing
+        rows = self.ROWS[:3] + [('-4.50', '80.00')]
+        discrepancies = reconcile(statement(rows))
+        self.assertEqual(len(discrepancies), 1)
+        self.assertEqual(discrepancies[0]['first_row'], 3)
+        self.assertEqual(discrepancies[0]['last_row'], 3)
+        self.assertEqual(discrepancies[0]['start_date'], '2024-01-04')
+        self.assertEqual(discrepancies[0]['mismatched_rows'], 1)
+        self.assertEqual(discrepancies[0]['difference'], '-20.00')
+
+    def test_rows_without_balance_are_not_mismatches(self):
+        rows = [self.ROWS[0], ('10.00', None), self.ROWS[2], self.ROWS[3]]
+        discrepancies = reconcile(statement(rows))
+        self.assertEqual(len(discrepancies), 1)
+        self.assertTrue(discrepancies[0]['missing_balance'])
+        self.assertEqual(discrepancies[0]['mismatched_rows'], 0)
+        self.assertTrue(UploadedFile(processed=True, discrepancies=discrepancies).reconciled)
+
+    def test_all_balances_missing(self):
+        rows = [(amount, None) for amount, _ in self.ROWS]
+        self.assertEqual(reconcile(statement(rows)), [])
+
+class AccessBankParserTests(SimpleTestCase):
+    def parse(self, text):
+        parser = AccessBankParser('statement.pdf')
+        parser.parse_page(text)
+        return parser.transactions
+
+    def test_three_amount_columns(self):
+        transactions = self.parse(
+            "05-Mar-24 POS PURCHASE SHOPRITE 1,500.00 0.00 48,500.00\n"
+            "06-Mar-24 SALARY MARCH 0.00 200,000.00 248,500.00"
+        )
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(transactions[0]['date'].date(), date(2024, 3, 5))
+        self.assertEqual(transactions[0]['description'], 'POS PURCHASE SHOPRITE')
+        self.assertEqual(transactions[0]['amount'], Decimal('-1500.00'))
+        self.assertEqual(transactions[0]['balance'], Decimal('48500.00'))
+        self.assertEqual(transactions[1]['amount'], Decimal('200000.00'))
+        self.assertEqual(transactions[1]['balance'], Decimal('248500.00'))
+
+    def test_two_amount_columns(self):
+        transactions = self.parse(
+            "Date Description Debit Credit\n"
+            "07-Mar-24 NIP TRF TO JOHN 2,000.00 0.00\n"
+            "08-Mar-24 REVERSAL 0.00 300.00"
+        )
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(transactions[0]['date'].date(), date(2024, 3, 7))
+        self.assertEqual(transactions[0]['amount'], Decimal('-2000.00'))
+        self.assertIsNone(transactions[0]['balance'])
+        self.assertEqual(transactions[1]['amount'], Decimal('300.00'))
+        self.assertIsNone(transactions[1]['balance'])
+
+class MerchantKeyTests(SimpleTestCase):
+    def test_keys(self):
+        cases = {
+            'POS PURCHASE UBER *TRIP 12/03/2024 REF:8812': 'uber trip',
+            'NETFLIX.COM 0423 LAGOS': 'netflix',
+            'POS NETFLIX.COM 0523': 'netflix',
+            'NIP TRF TO JOHN DOE/REF123': 'john doe',
+            'POS CARD DSTV 0423': 'dstv',
+            'WEB PURCHASE AMAZON.COM*AB12CD': 'amazon',
+            '0123456789 REF:12': '',
+        }
+        for description, key in cases.items():
+            with self.subTest(description=description):
+                self.assertEqual(merchant_key(description), key)
+
+    def test_key_fits_field(self):
+        self.assertLessEqual(len(merchant_key('X' * 300)), 100)
+
+class DetectPeriodTests(SimpleTestCase):
+    def detect(self, days, amounts):
+        start = date(2024, 1, 1).toordinal()
+        return detect_period(np.array([start + d for d in days]), np.array(amounts, dtype=float))
+
+    def test_monthly(self):
+        self.assertEqual(self.detect([0, 31, 60, 91, 121], [4500] * 5), 'monthly')
+
+    def test_weekly(self):
+        self.assertEqual(self.detect([0, 7, 14, 22, 28], [1000, 1000, 1100, 1000, 950]), 'weekly')
+
+    def test_too_few_occurrences(self):
+        self.assertIsNone(self.detect([0, 30], [4500, 4500]))
+
+    def test_irregular_intervals(self):
+        self.assertIsNone(self.detect([0, 3, 40, 45, 100], [4500] * 5))
+
+    def test_varying_amounts(self):
+        self.assertIsNone(self.detect([0, 30, 60, 90], [100, 5000, 250, 9000]))
+
+class SnapshotSummaryTests(TestCase):
+    """summarize() must match the ORM aggregates the dashboard used before."""
+
+    def setUp(self):
+        self.snapshot_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.snapshot_root, ignore_errors=True)
+        self.user = User.objects.create_user('analyst', password='secret')
+        food = Category.objects.create(user=self.user, name='Food', keywords='food')
+        uploaded_file = UploadedFile.objects.create(user=self.user, bank_name='GTBank', file='s.pdf', processed=True)
+        start = date(2024, 1, 3)
+        Transaction.objects.bulk_create([
+            Transaction(
+                uploaded_file=uploaded_file,
+                date=start + timedelta(days=i * 4),
+                description=f'ROW {i}',
+                amount=Decimal('5000.00') if i % 5 == 0 else Decimal(-1000 - i * 7) / 100,
+                category=food if i % 2 else None,
+                balance=None,
+            )
+            for i in range(30)
+        ])
+
+    def test_matches_orm_aggregates(self):
+        with override_settings(SNAPSHOT_ROOT=self.snapshot_root):
+            summary = summarize(build_snapshot(self.user))
+        transactions = Transaction.objects.filter(uploaded_file__user=self.user)
+        debits = transactions.filter(amount__lt=0)
+        credits = transactions.filter(amount__gt=0)
+
+        stats = summary['stats']
+        self.assertEqual(stats['total_spent'], abs(debits.aggregate(t=Sum('amount'))['t']))
+        self.assertEqual(stats['total_income'], credits.aggregate(t=Sum('amount'))['t'])
+        self.assertEqual(stats['transaction_count'], transactions.count())
+        self.assertEqual(stats['largest_expense'], abs(debits.aggregate(m=Min('amount'))['m']))
+        self.assertEqual(stats['largest_income'], credits.aggregate(m=Max('amount'))['m'])
+        self.assertAlmostEqual(
+            float(stats['avg_transaction']), abs(float(transactions.aggregate(a=Avg('amount'))['a'])), places=2
+        )
+
+        categories = {
+            c['category__name']: c
+            for c in debits.values('category__name').annotate(total=Sum('amount'), count=Count('id'))
+        }
+        self.assertEqual(len(summary['category_totals']), len(categories))
+        for row in summary['category_totals']:
+            self.assertEqual(row['total'], abs(categories[row['category__name']]['total']))
+            self.assertEqual(row['count'], categories[row['category__name']]['count'])
+
+        months = list(
+            transactions.annotate(month=TruncMonth('date')).values('month').annotate(
+                expenses=Sum('amount', filter=Q(amount__lt=0)),
+                income=Sum('amount', filter=Q(amount__gt=0)),
+                transaction_count=Count('id'),
+            ).order_by('month')
+        )
+        self.assertEqual(summary['monthly_totals'], months)
+
+        weeks = list(debits.annotate(week=TruncWeek('date')).values('week').annotate(total=Sum('amount')).order_by('week'))
+        self.assertEqual(summary['weekly_totals'], weeks)
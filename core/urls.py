@@ -5,6 +5,12 @@ urlpatterns = [
     path('', views.home, name='home'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('upload/', views.upload_statement, name='upload'),
+    path('upload/batch/', views.batch_upload, name='batch_upload'),
+    path('batch/<int:batch_id>/', views.batch_detail, name='batch_detail'),
+    path('batch/<int:batch_id>/status/', views.batch_status, name='batch_status'),
+    path('batch/<int:batch_id>/events/', views.batch_events, name='batch_events'),
+    path('api/upload/', views.async_upload, name='async_upload'),
+    path('api/dashboard-data/', views.dashboard_data, name='dashboard_data'),
     path('categories/', views.manage_categories, name='manage_categories'),
     path('transaction/<int:transaction_id>/edit/', views.edit_transaction, name='edit_transaction'),
 ]
\ No newline at end of file
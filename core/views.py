@@ -1,15 +1,53 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Sum, Q, Avg, Count, Max, Min
-from django.db.models.functions import TruncMonth, TruncWeek, ExtractHour
+from django.db.models import Q, Count
+from django.db.models.functions import ExtractHour
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.core.handlers.asgi import ASGIRequest
 from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from asgiref.sync import sync_to_async
 from datetime import timedelta
-from .models import UploadedFile, Transaction, Category
-from .forms import UploadStatementForm, CategoryForm, TransactionCategoryForm
+from functools import wraps
+from .models import UploadedFile, UploadBatch, Transaction, Category, RecurringPayment
+from .forms import UploadStatementForm, BatchUploadForm, CategoryForm, TransactionCategoryForm
+from .ingestion import ingest_file, create_batch, start_batch, astart_batch
+from .snapshots import load_snapshot, summarize
+from .categorization import remember_manual_category, forget_derived_categories
+import asyncio
 import json
 import os
+import time
+
+DATE_RANGE_DAYS = {
+    'month': 30,
+    '3months': 90,
+    '6months': 180,
+    'year': 365,
+}
+
+def async_login_required(view_func):
+    """login_required for async views (Django 5.0's decorator is sync only)."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+def filter_date_range(transactions, date_filter):
+    days = DATE_RANGE_DAYS.get(date_filter)
+    if days is None:
+        return transactions
+    start_date = timezone.now() - timedelta(days=days)
+    return transactions.filter(date__gte=start_date)
 
 def home(request):
     return render(request, 'core/home.html')
@@ -21,56 +59,12 @@ def dashboard(request):
     
     # Get date range for filtering
     date_filter = request.GET.get('date_range', 'all')
-    if date_filter == 'month':
-        start_date = timezone.now() - timedelta(days=30)
-        transactions = transactions.filter(date__gte=start_date)
-    elif date_filter == '3months':
-        start_date = timezone.now() - timedelta(days=90)
-        transactions = transactions.filter(date__gte=start_date)
-    elif date_filter == '6months':
-        start_date = timezone.now() - timedelta(days=180)
-        transactions = transactions.filter(date__gte=start_date)
-    elif date_filter == 'year':
-        start_date = timezone.now() - timedelta(days=365)
-        transactions = transactions.filter(date__gte=start_date)
-
-    # Basic statistics
-    total_spent = transactions.filter(amount__lt=0).aggregate(total=Sum('amount'))['total'] or 0
-    total_income = transactions.filter(amount__gt=0).aggregate(total=Sum('amount'))['total'] or 0
-    avg_transaction = transactions.aggregate(avg=Avg('amount'))['avg'] or 0
-    transaction_count = transactions.count()
-    largest_expense = transactions.filter(amount__lt=0).aggregate(max=Min('amount'))['max'] or 0
-    largest_income = transactions.filter(amount__gt=0).aggregate(max=Max('amount'))['max'] or 0
-
-    # Get spending by category with percentages
-    category_totals = list(transactions.filter(amount__lt=0).values('category__name')
-        .annotate(
-            total=Sum('amount'),
-            count=Count('id'),
-            avg=Avg('amount')
-        )
-        .order_by('total'))
-    
-    total_spending = abs(sum(cat['total'] for cat in category_totals))
-    for cat in category_totals:
-        cat['percentage'] = (abs(cat['total']) / total_spending * 100) if total_spending else 0
-        cat['total'] = abs(cat['total'])  # Convert to positive for display
-
-    # Get monthly spending trend
-    monthly_totals = list(transactions.annotate(
-        month=TruncMonth('date')
-    ).values('month').annotate(
-        expenses=Sum('amount', filter=Q(amount__lt=0)),
-        income=Sum('amount', filter=Q(amount__gt=0)),
-        transaction_count=Count('id')
-    ).order_by('month'))
-
-    # Get weekly spending pattern
-    weekly_totals = list(transactions.filter(amount__lt=0).annotate(
-        week=TruncWeek('date')
-    ).values('week').annotate(
-        total=Sum('amount')
-    ).order_by('week'))
+    transactions = filter_date_range(transactions, date_filter)
+
+    # Statistics and charts come from the user's columnar snapshot, the same
+    # data dashboard_data serves, rather than from ORM aggregates
+    snapshot = load_snapshot(request.user)
+    summary = summarize(snapshot, DATE_RANGE_DAYS.get(date_filter))
 
     # Recent high-value transactions
     high_value_transactions = transactions.order_by('amount')[:5]  # Top 5 expenses
@@ -78,18 +72,12 @@ def dashboard(request):
     context = {
         'files': user_files,
         'transactions': transactions.order_by('-date')[:50],  # Show last 50 transactions
-        'category_totals': json.dumps(category_totals, cls=DjangoJSONEncoder),
-        'monthly_totals': json.dumps(monthly_totals, cls=DjangoJSONEncoder),
-        'weekly_totals': json.dumps(weekly_totals, cls=DjangoJSONEncoder),
-        'stats': {
-            'total_spent': abs(total_spent),
-            'total_income': total_income,
-            'avg_transaction': abs(avg_transaction),
-            'transaction_count': transaction_count,
-            'largest_expense': abs(largest_expense),
-            'largest_income': largest_income,
-        },
+        'category_totals': json.dumps(summary['category_totals'], cls=DjangoJSONEncoder),
+        'monthly_totals': json.dumps(summary['monthly_totals'], cls=DjangoJSONEncoder),
+        'weekly_totals': json.dumps(summary['weekly_totals'], cls=DjangoJSONEncoder),
+        'stats': summary['stats'],
         'high_value_transactions': high_value_transactions,
+        'recurring_payments': RecurringPayment.objects.filter(user=request.user).select_related('category'),
         'date_filter': date_filter,
     }
     return render(request, 'core/dashboard.html', context)
@@ -104,43 +92,7 @@ def upload_statement(request):
             uploaded_file.save()
 
             try:
-                # Get the appropriate parser for the bank
-                parser_class = BANK_PARSERS.get(uploaded_file.bank_name)
-                if not parser_class:
-                    raise ValueError(f"No parser available for {uploaded_file.bank_name}")
-
-                # Parse the PDF file
-                parser = parser_class(uploaded_file.file.path)
-                transactions = parser.parse()
-
-                # Get or create categories
-                categories = {cat.name.lower(): cat for cat in Category.objects.filter(
-                    Q(user=request.user) | Q(is_system=True)
-                )}
-
-                # Save transactions to database
-                for transaction_data in transactions:
-                    # Find best matching category
-                    category = None
-                    desc = transaction_data['description'].lower()
-                    
-                    for cat in categories.values():
-                        if any(keyword in desc for keyword in cat.keyword_list):
-                            category = cat
-                            break
-
-                    Transaction.objects.create(
-                        uploaded_file=uploaded_file,
-                        date=transaction_data['date'],
-                        description=transaction_data['description'],
-                        amount=transaction_data['amount'],
-                        category=category,
-                        balance=transaction_data['balance']
-                    )
-
-                uploaded_file.processed = True
-                uploaded_file.save()
-                
+                ingest_file(uploaded_file)
                 messages.success(request, 'Statement uploaded and processed successfully!')
             except Exception as e:
                 messages.error(request, f'Error processing statement: {str(e)}')
@@ -155,6 +107,139 @@ def upload_statement(request):
     
     return render(request, 'core/upload.html', {'form': form})
 
+@login_required
+@csrf_exempt
+def batch_upload(request):
+    # Spool every uploaded file to disk instead of holding it in memory.
+    # The handlers must be replaced before the CSRF check reads request.POST.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    return _batch_upload(request)
+
+@csrf_protect
+def _batch_upload(request):
+    if request.method == 'POST':
+        form = BatchUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                batch = create_batch(
+                    request.user,
+                    form.cleaned_data['bank_name'],
+                    form.cleaned_data['files'],
+                )
+            except ValueError as e:
+                form.add_error('files', str(e))
+            else:
+                start_batch(batch)
+                messages.success(request, f'{batch.files.count()} statements queued for processing.')
+                return redirect('batch_detail', batch_id=batch.id)
+    else:
+        form = BatchUploadForm()
+
+    return render(request, 'core/batch_upload.html', {'form': form})
+
+@login_required
+def batch_detail(request, batch_id):
+    batch = get_object_or_404(UploadBatch, id=batch_id, user=request.user)
+    context = {
+        'batch': batch,
+        'files': batch.files.annotate(transaction_count=Count('transaction')).order_by('id'),
+        'progress': batch.progress(),
+    }
+    return render(request, 'core/batch_detail.html', context)
+
+@async_login_required
+async def batch_status(request, batch_id):
+    batch = await aget_object_or_404(UploadBatch, id=batch_id, user=await request.auser())
+    files = [
+        {
+            'id': f.id,
+            'name': os.path.basename(f.file.name),
+            'processed': f.processed,
+            'transaction_count': f.transaction_count,
+            'discrepancies': len(f.balance_mismatches),
+            'error': f.error_message,
+        }
+        async for f in batch.files.annotate(transaction_count=Count('transaction')).order_by('id')
+    ]
+    return JsonResponse({'progress': await batch.aprogress(), 'files': files})
+
+@async_login_required
+async def batch_events(request, batch_id):
+    """Server-sent events stream of a batch's progress until it finishes.
+
+    The stream also ends after SSE_MAX_SECONDS so abandoned batches do not
+    keep a poller alive; EventSource clients reconnect on their own.
+    """
+    batch = await aget_object_or_404(UploadBatch, id=batch_id, user=await request.auser())
+    deadline = time.monotonic() + settings.SSE_MAX_SECONDS
+
+    async def stream():
+        last = None
+        while True:
+            progress = await batch.aprogress()
+            if progress != last:
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+                last = progress
+            if progress['pending'] <= 0:
+                yield "event: done\ndata: {}\n\n"
+                return
+            if time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(1)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@async_login_required
+@csrf_exempt
+async def async_upload(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    # Same spooling as batch_upload; see the note there. The CSRF check and
+    # form parsing read the whole request body, so they run off the event loop.
+    request.upload_handlers = [TemporaryFileUploadHandler(request)]
+    response = await sync_to_async(_queue_upload)(request)
+
+    batch = getattr(request, 'queued_batch', None)
+    if batch is not None:
+        # Background tasks only outlive the request on a long-lived ASGI loop;
+        # under WSGI the per-request loop is torn down, so use a thread instead.
+        if isinstance(request, ASGIRequest):
+            astart_batch(batch)
+        else:
+            start_batch(batch)
+    return response
+
+@csrf_protect
+def _queue_upload(request):
+    form = BatchUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    try:
+        batch = create_batch(request.user, form.cleaned_data['bank_name'], form.cleaned_data['files'])
+    except ValueError as e:
+        return JsonResponse({'errors': {'files': [str(e)]}}, status=400)
+    request.queued_batch = batch
+    return JsonResponse({
+        'batch': batch.id,
+        'files': batch.files.count(),
+        'status_url': reverse('batch_status', args=[batch.id]),
+        'events_url': reverse('batch_events', args=[batch.id]),
+    }, status=202)
+
+@async_login_required
+async def dashboard_data(request):
+    # Served from the user's columnar snapshot rather than ORM aggregates
+    user = await request.auser()
+    snapshot = await sync_to_async(load_snapshot)(user)
+    days = DATE_RANGE_DAYS.get(request.GET.get('date_range', 'all'))
+    data = await sync_to_async(summarize)(snapshot, days)
+    return JsonResponse(data, encoder=DjangoJSONEncoder)
+
 @login_required
 def manage_categories(request):
     if request.method == 'POST':
@@ -163,6 +248,8 @@ def manage_categories(request):
             category = form.save(commit=False)
             category.user = request.user
             category.save()
+            # Cached merchant categories were picked without the new category
+            forget_derived_categories(request.user)
             messages.success(request, 'Category created successfully!')
             return redirect('manage_categories')
     else:
@@ -186,7 +273,8 @@ def edit_transaction(request, transaction_id):
     if request.method == 'POST':
         form = TransactionCategoryForm(request.POST, instance=transaction)
         if form.is_valid():
-            form.save()
+            transaction = form.save()
+            remember_manual_category(transaction)
             messages.success(request, 'Transaction updated successfully!')
             return redirect('dashboard')
     else:
@@ -196,4 +284,4 @@ def edit_transaction(request, transaction_id):
         'form': form,
         'transaction': transaction,
     }
-    return render(request, 'core/edit_transaction.html', context)
\ No newline at end of file
+    return render(request, 'core/edit_transaction.html', context)